@@ -7,6 +7,7 @@ Syncs emails from your inbox to a personal knowledge graph.
 
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -20,6 +21,14 @@ from src.filters import EmailFilter
 from src.search import parse_natural_query, search_emails, format_results_json
 
 
+# Processed emails are written to sync state in chunks of this size
+SEEN_FLUSH_INTERVAL = 100
+
+# Bytes of each body downloaded during sync. The classifier reads 4000
+# characters; the extra room covers quoted-printable and MIME overhead.
+SYNC_BODY_BYTES_LIMIT = 16384
+
+
 def load_config(config_path: Path) -> dict:
     """Load configuration from YAML file."""
     with open(config_path, 'r') as f:
@@ -32,13 +41,28 @@ def load_config(config_path: Path) -> dict:
     return config
 
 
+def classify_email(classifier: EmailClassifier, email, ignore_probe: bool):
+    """
+    Classify an email on a worker thread.
+
+    With ignore_probe, a cheap ignore check runs first and None is returned
+    for noise, skipping the full classification.
+    """
+    if ignore_probe and classifier.is_ignorable(email):
+        return None
+    return classifier.classify(email)
+
+
 def cmd_sync(args, config: dict) -> int:
     """Sync emails and route to knowledge graph."""
     print("Starting email sync...")
 
     # Initialize components
     state = SyncState(config['paths']['state_dir'])
-    classifier = EmailClassifier(model=config['anthropic']['model'])
+    classifier = EmailClassifier(
+        model=config['anthropic']['model'],
+        cache_path=config['paths']['state_dir'] / "classifications.db"
+    )
     router = ContentRouter(config['paths']['personal_dir'])
 
     # Determine sync date
@@ -48,7 +72,10 @@ def cmd_sync(args, config: dict) -> int:
     else:
         since_date = datetime.now() - timedelta(days=config['sync']['days_lookback'])
 
-    print(f"Fetching emails since {since_date.strftime('%Y-%m-%d %H:%M')}")
+    # After the first sync only messages above the last processed UID are fetched
+    uidvalidity, last_uid = state.get_uid_state()
+    if args.full:
+        last_uid = None
 
     # Connect and fetch emails
     email_config = config['email']
@@ -59,63 +86,143 @@ def cmd_sync(args, config: dict) -> int:
         keychain_service=email_config['keychain_service']
     )
 
-    try:
-        with client:
-            emails = client.fetch_emails(
-                since_date=since_date,
-                max_emails=config['sync']['max_emails']
-            )
-    except Exception as e:
-        print(f"Error connecting to email: {e}")
-        return 1
-
-    print(f"Found {len(emails)} emails")
-
     # Initialize filter
     filter_config = config.get('filters', {})
     email_filter = EmailFilter(filter_config)
 
     # Process each email
+    found_count = 0
     new_count = 0
     ignored_count = 0
     filtered_count = 0
     error_count = 0
 
-    for email in emails:
-        if state.is_seen(email):
-            continue
-
-        # Pre-classification filter (saves API calls)
-        if not email_filter.should_process(email):
-            reason = email_filter.get_reason(email)
-            print(f"  [filtered] {email.subject[:40]}... ({reason})")
-            filtered_count += 1
-            state.mark_seen(email)
-            continue
-
-        try:
-            # Classify
-            classification = classifier.classify(email)
+    # Load the seen set once and persist newly processed emails in chunks
+    seen_ids = state.snapshot_seen()
+    processed = []
+    failed_uids = []
 
-            if classification.category == "ignore":
-                ignored_count += 1
-                state.mark_seen(email)
-                continue
+    # Per-email lines are written in one go at the end rather than per email
+    log_lines = []
 
-            # Route to files
-            modified = router.route(email, classification)
-
-            if modified:
-                print(f"  [{classification.category}] {email.subject[:50]}...")
-                for f in modified:
-                    print(f"    -> {Path(f).name}")
-                new_count += 1
-
-            state.mark_seen(email)
-
-        except Exception as e:
-            print(f"  Error processing: {email.subject[:50]}... - {e}")
-            error_count += 1
+    # Classification is network-bound, so API calls run on a thread pool and
+    # start while later emails are still being fetched. Routing stays on this
+    # thread to keep file writes ordered.
+    concurrency = config['sync'].get('classify_concurrency', 8)
+    ignore_probe = config['sync'].get('ignore_probe', False)
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            pending = []
+
+            try:
+                with client:
+                    # Filter and dedupe on headers so skipped emails are never downloaded
+                    headers = client.fetch_headers(
+                        since_date=since_date,
+                        max_emails=config['sync']['max_emails'],
+                        last_uid=last_uid,
+                        uidvalidity=uidvalidity
+                    )
+                    found_count = len(headers)
+
+                    # The UID window only applies while the folder's UIDVALIDITY is unchanged
+                    if last_uid is not None and client.uidvalidity == uidvalidity:
+                        print(f"Fetching emails after UID {last_uid}")
+                    else:
+                        print(f"Fetching emails since {since_date.strftime('%Y-%m-%d %H:%M')}")
+
+                    # Emails whose headers could not be read are retried next sync
+                    for uid in client.missed_header_uids:
+                        log_lines.append(f"  Error fetching headers of email {uid}")
+                    failed_uids.extend(client.missed_header_uids)
+                    error_count += len(client.missed_header_uids)
+
+                    survivors = []
+                    for header in headers:
+                        key = state.seen_key(header)
+                        if key in seen_ids:
+                            continue
+                        seen_ids.add(key)
+
+                        # Pre-classification filter (saves API calls)
+                        sender = email_filter.parse_from(header)
+                        if not email_filter.should_process(header, sender):
+                            reason = email_filter.get_reason(header, sender)
+                            if args.verbose:
+                                log_lines.append(f"  [filtered] {header.subject[:40]}... ({reason})")
+                            filtered_count += 1
+                            processed.append(header)
+                            continue
+
+                        survivors.append(header.uid)
+
+                    for email in client.iter_emails_by_uid(
+                        survivors, body_bytes_limit=SYNC_BODY_BYTES_LIMIT
+                    ):
+                        pending.append((
+                            email,
+                            executor.submit(classify_email, classifier, email, ignore_probe)
+                        ))
+
+                    # Messages missing from the FETCH reply or failing to parse were
+                    # not yielded; count them as failures so they are retried
+                    fetched_uids = {email.uid for email, _ in pending}
+                    missed_uids = [uid for uid in survivors if uid not in fetched_uids]
+                    for uid in missed_uids:
+                        log_lines.append(f"  Error fetching email {uid}")
+                    failed_uids.extend(missed_uids)
+                    error_count += len(missed_uids)
+            except Exception as e:
+                executor.shutdown(cancel_futures=True)
+                print(f"Error connecting to email: {e}")
+                return 1
+
+            print(f"Found {found_count} emails")
+
+            # Section files are written in batches alongside the seen state
+            with router.bulk():
+                for email, future in pending:
+                    # Save progress periodically so an interrupted sync keeps its work
+                    if len(processed) >= SEEN_FLUSH_INTERVAL:
+                        router.flush_all()
+                        state.mark_seen_batch(processed)
+                        processed.clear()
+
+                    try:
+                        # Classify
+                        classification = future.result()
+
+                        if classification is None or classification.category == "ignore":
+                            ignored_count += 1
+                            processed.append(email)
+                            continue
+
+                        # Route to files
+                        modified = router.route(email, classification)
+
+                        if modified:
+                            if args.verbose:
+                                log_lines.append(f"  [{classification.category}] {email.subject[:50]}...")
+                                log_lines.extend(f"    -> {Path(f).name}" for f in modified)
+                            new_count += 1
+
+                        processed.append(email)
+
+                    except Exception as e:
+                        log_lines.append(f"  Error processing: {email.subject[:50]}... - {e}")
+                        error_count += 1
+                        if email.uid is not None:
+                            failed_uids.append(email.uid)
+    finally:
+        router.close()
+        state.mark_seen_batch(processed)
+        if log_lines:
+            sys.stdout.write("\n".join(log_lines) + "\n")
+
+    # Resume just before the earliest failure so it is retried next time
+    if client.max_uid is not None:
+        resume_uid = min(failed_uids) - 1 if failed_uids else client.max_uid
+        state.update_uid_state("INBOX", client.uidvalidity, resume_uid)
 
     state.update_last_sync()
 
@@ -158,13 +265,16 @@ def cmd_check(args, config: dict) -> int:
 
     try:
         with client:
-            emails = client.fetch_emails(since_date=since_date, max_emails=100)
+            # Headers are enough to count, so no bodies are downloaded
+            headers = client.fetch_headers(since_date=since_date, max_emails=100)
     except Exception as e:
         print(f"Error: {e}")
         return 1
 
     # Count unseen
-    unseen = [e for e in emails if not state.is_seen(e)]
+    seen_ids = state.snapshot_seen()
+    unseen = [h for h in headers if state.seen_key(h) not in seen_ids]
+
     print(f"Pending emails: {len(unseen)}")
 
     if unseen and args.verbose:
@@ -252,6 +362,7 @@ def main():
     # sync command
     sync_parser = subparsers.add_parser('sync', help='Sync emails to knowledge graph')
     sync_parser.add_argument('--full', action='store_true', help='Full sync (ignore last sync time)')
+    sync_parser.add_argument('-v', '--verbose', action='store_true', help='Show per-email results')
 
     # status command
     subparsers.add_parser('status', help='Show sync status')
@@ -3,8 +3,13 @@ Email classifier using Claude API.
 """
 
 import json
+import hashlib
+import sqlite3
 import subprocess
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, asdict
+from functools import lru_cache
+from pathlib import Path
 from typing import List, Optional
 from anthropic import Anthropic
 
@@ -21,8 +26,9 @@ class ClassificationResult:
     tags: List[str]  # Additional tags
 
 
+@lru_cache(maxsize=1)
 def get_anthropic_api_key() -> str:
-    """Retrieve Anthropic API key from macOS Keychain."""
+    """Retrieve Anthropic API key from macOS Keychain (cached for the process lifetime)."""
     try:
         result = subprocess.run(
             ["security", "find-generic-password", "-s", "anthropic", "-a", "api_key", "-w"],
@@ -35,18 +41,7 @@ def get_anthropic_api_key() -> str:
         raise ValueError(f"Failed to get Anthropic API key from Keychain: {e.stderr}")
 
 
-CLASSIFICATION_PROMPT = """Analyze this email and extract structured information.
-
-Email:
-From: {from_addr}
-To: {to_addr}
-Subject: {subject}
-Date: {date}
-
-Body:
-{body}
-
----
+SYSTEM_PROMPT = """Analyze the email you are given and extract structured information.
 
 Classify and extract information as JSON with these fields:
 
@@ -71,20 +66,139 @@ Classify and extract information as JSON with these fields:
 
 - tags: Array of relevant tags like "meeting", "followup", "waiting", "review"
 
-Respond with ONLY valid JSON, no other text."""
+Respond with ONLY valid JSON, no other text. Output raw JSON only, never wrap it in markdown code fences."""
+
+
+IGNORE_PROMPT = """Decide whether the email you are given should be ignored: spam, newsletters, automated notifications, or marketing.
+
+Respond with ONLY {"ignore": true} or {"ignore": false}, no other text."""
+
+
+EMAIL_PROMPT = """From: {from_addr}
+To: {to_addr}
+Subject: {subject}
+Date: {date}
+
+Body:
+{body}"""
+
+
+def _parse_json_response(text: str) -> Optional[dict]:
+    """Parse a JSON reply from Claude, or return None if it is malformed."""
+    # The system prompt asks for bare JSON, so try that first
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    # Clean up response if wrapped in markdown
+    text = text.strip()
+    if text.startswith("```"):
+        lines = text.split("\n")
+        try:
+            return json.loads("\n".join(lines[1:-1]))
+        except json.JSONDecodeError:
+            return None
+
+    return None
+
+
+class ClassificationCache:
+    """SQLite store of classification results keyed by email content hash."""
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Shared by the classification worker threads
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS classifications (hash BLOB PRIMARY KEY, json TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: bytes) -> Optional[ClassificationResult]:
+        """Return the cached result for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT json FROM classifications WHERE hash = ?", (key,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        try:
+            return ClassificationResult(**json.loads(row[0]))
+        except (json.JSONDecodeError, TypeError):
+            return None
+
+    def put(self, key: bytes, result: ClassificationResult) -> None:
+        """Store a classification result."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications (hash, json) VALUES (?, ?)",
+                (key, json.dumps(asdict(result)))
+            )
+            self._conn.commit()
 
 
 class EmailClassifier:
     """Classifies emails using Claude API."""
 
-    def __init__(self, model: str = "claude-3-haiku-20240307"):
+    def __init__(self, model: str = "claude-3-haiku-20240307", cache_path: Optional[Path] = None):
         self.api_key = get_anthropic_api_key()
         self.client = Anthropic(api_key=self.api_key)
         self.model = model
+        self.cache = ClassificationCache(cache_path) if cache_path else None
+
+    def _cache_key(self, email) -> bytes:
+        """Hash the fields that determine a classification."""
+        content = f"{self.model}|{email.from_addr}|{email.subject}|{email.body[:4000]}"
+        return hashlib.blake2b(content.encode(), digest_size=16).digest()
+
+    def is_ignorable(self, email) -> bool:
+        """
+        Cheaply check whether an email is noise before full classification.
+
+        Uses a short prompt, a trimmed body and a tiny output budget. Returns
+        False when unsure so the email still gets classified.
+        """
+        if self.cache:
+            cached = self.cache.get(self._cache_key(email))
+            if cached:
+                return cached.category == "ignore"
+
+        prompt = EMAIL_PROMPT.format(
+            from_addr=email.from_addr,
+            to_addr=email.to_addr,
+            subject=email.subject,
+            date=email.date.isoformat(),
+            body=email.body[:1000]
+        )
+
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=8,
+            system=IGNORE_PROMPT,
+            messages=[
+                {"role": "user", "content": prompt}
+            ]
+        )
+
+        data = _parse_json_response(response.content[0].text)
+        return isinstance(data, dict) and data.get("ignore") is True
 
     def classify(self, email) -> ClassificationResult:
-        """Classify a single email."""
-        prompt = CLASSIFICATION_PROMPT.format(
+        """Classify a single email, reusing a cached result when available."""
+        cache_key = None
+        if self.cache:
+            cache_key = self._cache_key(email)
+            cached = self.cache.get(cache_key)
+            if cached:
+                return cached
+
+        prompt = EMAIL_PROMPT.format(
             from_addr=email.from_addr,
             to_addr=email.to_addr,
             subject=email.subject,
@@ -92,25 +206,20 @@ class EmailClassifier:
             body=email.body[:4000]  # Limit body size
         )
 
+        # Fixed instructions go in the system prompt; the user message holds only the email
         response = self.client.messages.create(
             model=self.model,
             max_tokens=1024,
+            system=SYSTEM_PROMPT,
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
 
         # Parse JSON response
-        response_text = response.content[0].text.strip()
-
-        # Clean up response if wrapped in markdown
-        if response_text.startswith("```"):
-            lines = response_text.split("\n")
-            response_text = "\n".join(lines[1:-1])
+        data = _parse_json_response(response.content[0].text)
 
-        try:
-            data = json.loads(response_text)
-        except json.JSONDecodeError as e:
+        if data is None:
             # Fallback for malformed JSON
             return ClassificationResult(
                 category="log_entry",
@@ -122,7 +231,7 @@ class EmailClassifier:
                 tags=[]
             )
 
-        return ClassificationResult(
+        result = ClassificationResult(
             category=data.get("category", "log_entry"),
             priority=data.get("priority", "P3"),
             people=data.get("people", []),
@@ -131,3 +240,9 @@ class EmailClassifier:
             action_items=data.get("action_items", []),
             tags=data.get("tags", [])
         )
+
+        # Only successful parses are cached so malformed responses get retried
+        if self.cache:
+            self.cache.put(cache_key, result)
+
+        return result
@@ -11,8 +11,10 @@ import email as email_lib
 from email.header import decode_header
 from email.message import Message as EmailMessage
 from email.utils import parsedate_to_datetime
+from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timedelta
-from typing import List, Optional, Any
+from typing import Dict, Iterator, List, Optional, Tuple, Any
 import subprocess
 import re
 
@@ -28,7 +30,7 @@ class Email:
         subject: str,
         body: str,
         date: datetime,
-        raw_email: Any
+        uid: Optional[int] = None
     ):
         self.message_id = message_id
         self.from_addr = from_addr
@@ -36,14 +38,26 @@ class Email:
         self.subject = subject
         self.body = body
         self.date = date
-        self.raw_email = raw_email
+        self.uid = uid
 
     def __repr__(self):
         return f"Email(from={self.from_addr}, subject={self.subject[:50]}...)"
 
 
+@dataclass
+class EmailHeader:
+    """Envelope fields of an email, fetched without its body."""
+    uid: int
+    message_id: str
+    from_addr: str
+    to_addr: str
+    subject: str
+    date: datetime
+
+
+@lru_cache(maxsize=32)
 def get_keychain_password(service: str, account: str) -> str:
-    """Retrieve password from macOS Keychain."""
+    """Retrieve password from macOS Keychain (cached for the process lifetime)."""
     try:
         result = subprocess.run(
             ["security", "find-generic-password", "-s", service, "-a", account, "-w"],
@@ -64,31 +78,40 @@ def decode_mime_header(header: Optional[str]) -> str:
     decoded_parts = []
     for part, charset in decode_header(header):
         if isinstance(part, bytes):
-            decoded_parts.append(part.decode(charset or 'utf-8', errors='replace'))
+            try:
+                decoded_parts.append(part.decode(charset or 'utf-8', errors='replace'))
+            except LookupError:
+                # Unknown charset name; keep what utf-8 can make of it
+                decoded_parts.append(part.decode('utf-8', errors='replace'))
         else:
             decoded_parts.append(part)
 
     return ' '.join(decoded_parts)
 
 
+_MULTI_NL_RE = re.compile(r'\n{3,}')
+
+
 def extract_email_body(msg: EmailMessage) -> str:
     """Extract plain text body from email message."""
     body = ""
 
     if msg.is_multipart():
         for part in msg.walk():
-            content_type = part.get_content_type()
-            content_disposition = str(part.get("Content-Disposition", ""))
+            # Cheap type check first; most parts of large mails are not text/plain
+            if part.get_content_type() != "text/plain":
+                continue
+            if part.get_content_disposition() == "attachment":
+                continue
 
-            if content_type == "text/plain" and "attachment" not in content_disposition:
-                try:
-                    charset = part.get_content_charset() or 'utf-8'
-                    payload = part.get_payload(decode=True)
-                    if payload:
-                        body = payload.decode(charset, errors='replace')
-                        break
-                except Exception:
-                    continue
+            try:
+                charset = part.get_content_charset() or 'utf-8'
+                payload = part.get_payload(decode=True)
+                if payload:
+                    body = payload.decode(charset, errors='replace')
+                    break
+            except Exception:
+                continue
     else:
         content_type = msg.get_content_type()
         if content_type == "text/plain":
@@ -101,12 +124,120 @@ def extract_email_body(msg: EmailMessage) -> str:
                 pass
 
     # Clean up body
-    body = re.sub(r'\r\n', '\n', body)
-    body = re.sub(r'\n{3,}', '\n\n', body)
+    body = body.replace('\r\n', '\n')
+    # Substring search is far cheaper than running the regex over a long body
+    if '\n\n\n' in body:
+        body = _MULTI_NL_RE.sub('\n\n', body)
 
     return body.strip()
 
 
+_UID_RE = re.compile(rb'UID (\d+)')
+_FETCH_START_RE = re.compile(rb'\d+ \(')
+_SECTION_RE = re.compile(rb'BODY\[([^\]]*)\]')
+
+_HEADER_FIELDS = "FROM TO SUBJECT DATE MESSAGE-ID"
+
+
+def _parse_header_fields(msg: EmailMessage) -> Tuple[str, str, str, str, datetime]:
+    """Decode (message_id, from, to, subject, date) from message headers."""
+    message_id = msg.get("Message-ID", "")
+    from_addr = decode_mime_header(msg.get("From", ""))
+    to_addr = decode_mime_header(msg.get("To", ""))
+    subject = decode_mime_header(msg.get("Subject", ""))
+
+    # Parse date
+    date_str = msg.get("Date", "")
+    try:
+        date = parsedate_to_datetime(date_str)
+    except Exception:
+        date = datetime.now()
+
+    return message_id, from_addr, to_addr, subject, date
+
+
+def _parse_raw(email_id: int, raw_bytes: bytes) -> Tuple[Optional[Email], Optional[str]]:
+    """
+    Parse fetched message bytes into an Email.
+
+    Errors are returned rather than raised, so one malformed message does
+    not fail the rest of its batch.
+    """
+    try:
+        raw_email = email_lib.message_from_bytes(raw_bytes)
+        message_id, from_addr, to_addr, subject, date = _parse_header_fields(raw_email)
+
+        # Extract body
+        body = extract_email_body(raw_email)
+
+        return Email(
+            message_id=message_id,
+            from_addr=from_addr,
+            to_addr=to_addr,
+            subject=subject,
+            body=body,
+            date=date,
+            uid=email_id
+        ), None
+
+    except Exception as e:
+        return None, str(e)
+
+
+def _split_fetch_response(msg_data: list) -> Dict[int, Dict[bytes, bytes]]:
+    """
+    Group a UID FETCH response into {uid: {section: literal bytes}}.
+
+    Section is the text inside BODY[...], e.g. b"" for BODY[], b"HEADER" or
+    b"TEXT". The UID may be reported before or after the literals.
+    """
+    messages = []
+    for item in msg_data:
+        prefix, literal = item if isinstance(item, tuple) else (item, None)
+        if not isinstance(prefix, bytes):
+            continue
+
+        # Each message's response starts with "<seq> ("
+        if _FETCH_START_RE.match(prefix):
+            messages.append([None, {}])
+        if not messages:
+            continue
+
+        current = messages[-1]
+        uid_match = _UID_RE.search(prefix)
+        if uid_match:
+            current[0] = int(uid_match.group(1))
+        if literal is not None:
+            section = _SECTION_RE.search(prefix)
+            current[1][section.group(1) if section else b""] = literal
+
+    # Merge, since servers may send unsolicited FLAGS updates for the same UID
+    by_uid = {}
+    for uid, sections in messages:
+        if uid is not None and sections:
+            by_uid.setdefault(uid, {}).update(sections)
+    return by_uid
+
+
+def build_id_set(ids: List[int]) -> bytes:
+    """
+    Collapse IMAP ids into a compact sequence set.
+
+    [1, 2, 3, 7, 9, 10] -> b"1:3,7,9:10"
+    """
+    numbers = sorted(ids)
+    ranges = []
+    start = prev = numbers[0]
+    for n in numbers[1:]:
+        if n == prev + 1:
+            prev = n
+            continue
+        ranges.append(f"{start}:{prev}" if start != prev else str(start))
+        start = prev = n
+    ranges.append(f"{start}:{prev}" if start != prev else str(start))
+    return ",".join(ranges).encode()
+
+
 class EmailClient:
     """IMAP client for email servers."""
 
@@ -123,8 +254,18 @@ class EmailClient:
         self.keychain_service = keychain_service
         self.connection: Optional[imaplib.IMAP4_SSL] = None
 
+        # Set by iter_emails for the selected folder
+        self.uidvalidity: Optional[int] = None
+        self.max_uid: Optional[int] = None
+
+        # Set by fetch_headers: UIDs found by the search but not returned
+        self.missed_header_uids: List[int] = []
+
     def connect(self) -> None:
-        """Connect to IMAP server."""
+        """Connect to IMAP server, reusing the current connection if still alive."""
+        if self.noop():
+            return
+
         password = get_keychain_password(self.keychain_service, self.email_address)
 
         self.connection = imaplib.IMAP4_SSL(self.imap_server, self.imap_port)
@@ -139,6 +280,27 @@ class EmailClient:
                 pass
             self.connection = None
 
+    def reconnect(self) -> None:
+        """Drop the current connection and log in again."""
+        self.disconnect()
+        self.connect()
+
+    def noop(self) -> bool:
+        """
+        Send NOOP to keep the connection alive.
+
+        Returns False (and forgets the connection) if the server has dropped it.
+        """
+        if not self.connection:
+            return False
+
+        try:
+            self.connection.noop()
+            return True
+        except (imaplib.IMAP4.abort, OSError):
+            self.connection = None
+            return False
+
     def fetch_emails(
         self,
         folder: str = "INBOX",
@@ -146,13 +308,157 @@ class EmailClient:
         max_emails: int = 50
     ) -> List[Email]:
         """Fetch emails from specified folder."""
+        return list(self.iter_emails(folder, since_date, max_emails))
+
+    def iter_emails(
+        self,
+        folder: str = "INBOX",
+        since_date: Optional[datetime] = None,
+        max_emails: int = 50,
+        batch_size: int = 50,
+        last_uid: Optional[int] = None,
+        uidvalidity: Optional[int] = None,
+        body_bytes_limit: Optional[int] = None
+    ) -> Iterator[Email]:
+        """
+        Yield emails from specified folder as they are fetched.
+
+        See _search for how last_uid and uidvalidity narrow the search and
+        iter_emails_by_uid for body_bytes_limit.
+        """
+        email_ids = self._search(folder, since_date, max_emails, last_uid, uidvalidity)
+        yield from self.iter_emails_by_uid(
+            email_ids, folder=folder, batch_size=batch_size, body_bytes_limit=body_bytes_limit
+        )
+
+    def fetch_headers(
+        self,
+        folder: str = "INBOX",
+        since_date: Optional[datetime] = None,
+        max_emails: int = 50,
+        batch_size: int = 200,
+        last_uid: Optional[int] = None,
+        uidvalidity: Optional[int] = None
+    ) -> List[EmailHeader]:
+        """
+        Fetch only the envelope headers of matching emails.
+
+        Lets callers filter and deduplicate before downloading any bodies;
+        pass the surviving UIDs to iter_emails_by_uid. UIDs missing from the
+        reply or whose headers fail to parse are left in self.missed_header_uids.
+        """
+        email_ids = self._search(folder, since_date, max_emails, last_uid, uidvalidity)
+        self.missed_header_uids = []
+
+        headers = []
+        for i in range(0, len(email_ids), batch_size):
+            batch = email_ids[i:i + batch_size]
+            _, msg_data = self._uid(
+                folder, 'FETCH', build_id_set(batch), f"(UID BODY.PEEK[HEADER.FIELDS ({_HEADER_FIELDS})])"
+            )
+            sections_by_uid = _split_fetch_response(msg_data)
+
+            for email_id in batch:
+                sections = sections_by_uid.get(email_id)
+                if not sections:
+                    self.missed_header_uids.append(email_id)
+                    continue
+                raw_bytes = next(iter(sections.values()))
+                try:
+                    msg = email_lib.message_from_bytes(raw_bytes)
+                    headers.append(EmailHeader(email_id, *_parse_header_fields(msg)))
+                except Exception as e:
+                    print(f"Error parsing headers of email {email_id}: {e}")
+                    self.missed_header_uids.append(email_id)
+
+        return headers
+
+    def iter_emails_by_uid(
+        self,
+        email_ids: List[int],
+        folder: str = "INBOX",
+        batch_size: int = 50,
+        body_bytes_limit: Optional[int] = None
+    ) -> Iterator[Email]:
+        """
+        Yield full emails for the given UIDs in order.
+
+        Messages are downloaded batch_size at a time, one round-trip per batch,
+        so only the current batch is held in memory. The folder must already be
+        selected by a previous search (iter_emails or fetch_headers).
+
+        If body_bytes_limit is set, only the headers and the first
+        body_bytes_limit bytes of each body are downloaded.
+        """
+        if body_bytes_limit is None:
+            fetch_items = "(UID BODY.PEEK[])"
+        else:
+            fetch_items = f"(UID BODY.PEEK[HEADER] BODY.PEEK[TEXT]<0.{body_bytes_limit}>)"
+
+        for i in range(0, len(email_ids), batch_size):
+            batch = email_ids[i:i + batch_size]
+
+            # One round-trip per batch. BODY.PEEK leaves \Seen untouched.
+            _, msg_data = self._uid(folder, 'FETCH', build_id_set(batch), fetch_items)
+
+            raw_by_uid = {}
+            for email_id, sections in _split_fetch_response(msg_data).items():
+                if body_bytes_limit is None:
+                    if b"" in sections:
+                        raw_by_uid[email_id] = sections[b""]
+                elif b"HEADER" in sections:
+                    text = sections.get(b"TEXT", b"")
+
+                    # A cut body can end mid-line, and a partial base64 line no
+                    # longer decodes. Keep whole lines only; base64 lines are 76
+                    # characters, so what remains is a multiple of 4.
+                    if len(text) >= body_bytes_limit:
+                        text = text[:text.rfind(b"\n") + 1]
+
+                    # HEADER includes the blank line that separates it from the body
+                    raw_by_uid[email_id] = sections[b"HEADER"] + text
+
+            for email_id in batch:
+                raw_bytes = raw_by_uid.get(email_id)
+                if raw_bytes is None:
+                    continue
+
+                parsed, error = _parse_raw(email_id, raw_bytes)
+                if error:
+                    print(f"Error parsing email {email_id}: {error}")
+                    continue
+
+                yield parsed
+
+    def _search(
+        self,
+        folder: str,
+        since_date: Optional[datetime],
+        max_emails: int,
+        last_uid: Optional[int],
+        uidvalidity: Optional[int]
+    ) -> List[int]:
+        """
+        Select folder and return the UIDs of the most recent matching emails.
+
+        If last_uid is given and uidvalidity still matches the folder, only
+        messages with a higher UID are searched; otherwise since_date is used.
+        Sets self.uidvalidity and self.max_uid (highest UID returned).
+        """
         if not self.connection:
             raise RuntimeError("Not connected to IMAP server")
 
         self.connection.select(folder)
+        self.uidvalidity = self._get_uidvalidity()
+        self.max_uid = None
+
+        # UIDs are only comparable while UIDVALIDITY is unchanged
+        use_uid_window = last_uid is not None and uidvalidity == self.uidvalidity
 
         # Build search criteria
-        if since_date:
+        if use_uid_window:
+            search_criteria = f'UID {last_uid + 1}:*'
+        elif since_date:
             date_str = since_date.strftime("%d-%b-%Y")
             search_criteria = f'(SINCE {date_str})'
         else:
@@ -161,57 +467,49 @@ class EmailClient:
             date_str = week_ago.strftime("%d-%b-%Y")
             search_criteria = f'(SINCE {date_str})'
 
-        _, message_numbers = self.connection.search(None, search_criteria)
+        # UIDs stay stable for the whole session, unlike sequence numbers
+        _, message_numbers = self._uid(folder, 'SEARCH', None, search_criteria)
 
         if not message_numbers[0]:
             return []
 
-        email_ids = message_numbers[0].split()
+        email_ids = [int(i) for i in message_numbers[0].split()]
+
+        # "n:*" always matches the highest UID, even when it is below n
+        if use_uid_window:
+            email_ids = [i for i in email_ids if i > last_uid]
+            if not email_ids:
+                return []
 
         # Limit to most recent emails
         email_ids = email_ids[-max_emails:]
+        self.max_uid = max(email_ids)
 
-        emails = []
-        for email_id in email_ids:
-            try:
-                _, msg_data = self.connection.fetch(email_id, "(RFC822)")
-
-                if msg_data[0] is None:
-                    continue
+        return email_ids
 
-                raw_email = email_lib.message_from_bytes(msg_data[0][1])
+    def _uid(self, folder: str, command: str, *args) -> Any:
+        """Run a UID command, reconnecting once if the server dropped the connection."""
+        try:
+            return self.connection.uid(command, *args)
+        except imaplib.IMAP4.abort:
+            self.reconnect()
+            self.connection.select(folder)
 
-                # Extract fields
-                message_id = raw_email.get("Message-ID", "")
-                from_addr = decode_mime_header(raw_email.get("From", ""))
-                to_addr = decode_mime_header(raw_email.get("To", ""))
-                subject = decode_mime_header(raw_email.get("Subject", ""))
+            # UIDs from before the drop are only valid under the same UIDVALIDITY
+            if self._get_uidvalidity() != self.uidvalidity:
+                raise RuntimeError(f"UIDVALIDITY of {folder} changed while fetching")
 
-                # Parse date
-                date_str = raw_email.get("Date", "")
-                try:
-                    date = parsedate_to_datetime(date_str)
-                except Exception:
-                    date = datetime.now()
-
-                # Extract body
-                body = extract_email_body(raw_email)
-
-                emails.append(Email(
-                    message_id=message_id,
-                    from_addr=from_addr,
-                    to_addr=to_addr,
-                    subject=subject,
-                    body=body,
-                    date=date,
-                    raw_email=raw_email
-                ))
-
-            except Exception as e:
-                print(f"Error parsing email {email_id}: {e}")
-                continue
+            return self.connection.uid(command, *args)
 
-        return emails
+    def _get_uidvalidity(self) -> Optional[int]:
+        """Read UIDVALIDITY from the last SELECT response."""
+        _, data = self.connection.response('UIDVALIDITY')
+        if data and data[0]:
+            try:
+                return int(data[0])
+            except ValueError:
+                return None
+        return None
 
     def __enter__(self):
         self.connect()
@@ -3,7 +3,13 @@ Email filtering for pre-classification filtering.
 """
 
 import re
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+
+_ANGLE_RE = re.compile(r'<([^>]+)>')
+
+# (lowercased From header, email address, domain)
+ParsedFrom = Tuple[str, Optional[str], Optional[str]]
 
 
 class EmailFilter:
@@ -24,14 +30,28 @@ class EmailFilter:
         self.addresses = set(a.lower() for a in (config.get('addresses') or []))
         self.patterns = [re.compile(p, re.IGNORECASE) for p in (config.get('patterns') or [])]
 
-    def should_process(self, email) -> bool:
+        # Domains never contain '@' and addresses always do, so one set serves both
+        self._simple_match = self.domains | self.addresses
+
+    def parse_from(self, email) -> ParsedFrom:
+        """
+        Extract the sender fields used for matching.
+
+        Pass the result to should_process and get_reason to parse only once.
+        """
+        from_addr = email.from_addr.lower()
+        email_addr = self._extract_email(from_addr)
+        domain = self._extract_domain(email_addr)
+        return from_addr, email_addr, domain
+
+    def should_process(self, email, parsed: Optional[ParsedFrom] = None) -> bool:
         """
         Check if email should be processed.
 
         Returns True if email should be classified and routed.
         Returns False if email should be skipped.
         """
-        matches = self._matches_filter(email)
+        matches = self._matches_filter(email, parsed)
 
         if self.mode == 'blocklist':
             # Process if NOT in blocklist
@@ -40,18 +60,12 @@ class EmailFilter:
             # Process if IN allowlist
             return matches
 
-    def _matches_filter(self, email) -> bool:
+    def _matches_filter(self, email, parsed: Optional[ParsedFrom] = None) -> bool:
         """Check if email matches any filter criteria."""
-        from_addr = email.from_addr.lower()
-        email_addr = self._extract_email(from_addr)
-        domain = self._extract_domain(email_addr)
-
-        # Check domain
-        if domain and domain in self.domains:
-            return True
+        from_addr, email_addr, domain = parsed or self.parse_from(email)
 
-        # Check exact address
-        if email_addr and email_addr in self.addresses:
+        # Check domain and exact address
+        if email_addr in self._simple_match or domain in self._simple_match:
             return True
 
         # Check patterns against full from_addr
@@ -69,7 +83,7 @@ class EmailFilter:
         "john@example.com" -> "john@example.com"
         """
         # Try to extract from angle brackets
-        match = re.search(r'<([^>]+)>', from_addr)
+        match = _ANGLE_RE.search(from_addr)
         if match:
             return match.group(1).lower()
 
@@ -86,11 +100,9 @@ class EmailFilter:
 
         return email_addr.split('@')[1].lower()
 
-    def get_reason(self, email) -> str:
+    def get_reason(self, email, parsed: Optional[ParsedFrom] = None) -> str:
         """Get human-readable reason why email was filtered."""
-        from_addr = email.from_addr.lower()
-        email_addr = self._extract_email(from_addr)
-        domain = self._extract_domain(email_addr)
+        from_addr, email_addr, domain = parsed or self.parse_from(email)
 
         if domain and domain in self.domains:
             return f"domain:{domain}"
@@ -3,10 +3,35 @@ Content router for writing to knowledge graph files.
 """
 
 import re
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
+_NON_WORD = re.compile(r'[^\w\s-]')
+_DASH_WS = re.compile(r'[-\s]+')
+
+
+def _slugify(s: str) -> str:
+    """Lowercase s and reduce it to a dash-separated, filename-safe slug."""
+    return _DASH_WS.sub('-', _NON_WORD.sub('', s.lower())).strip('-')
+
+
+def _find_line(text: str, line: str) -> int:
+    """Return the end offset of the first line of text equal to line once stripped, or -1."""
+    start = 0
+    while True:
+        idx = text.find(line, start)
+        if idx < 0:
+            return -1
+        line_start = text.rfind('\n', 0, idx) + 1
+        line_end = text.find('\n', idx)
+        if line_end < 0:
+            line_end = len(text)
+        if text[line_start:line_end].strip() == line:
+            return line_end
+        start = line_end
+
 
 class ContentRouter:
     """Routes classified emails to appropriate markdown files."""
@@ -25,6 +50,12 @@ class ContentRouter:
         self.logs_dir.mkdir(parents=True, exist_ok=True)
         self.knowledge_dir.mkdir(parents=True, exist_ok=True)
 
+        # Section files are read once and edited in memory; route() writes
+        # them back unless inside bulk(), where flush_all() does it once
+        self._file_cache: dict[Path, str] = {}
+        self._dirty: set[Path] = set()
+        self._autoflush = True
+
     def route(self, email, classification) -> list[str]:
         """
         Route email content to appropriate files.
@@ -49,10 +80,6 @@ class ContentRouter:
             self._add_to_home(email, classification)
             modified_files.append(str(self.home_file))
 
-        elif category == "person_info":
-            files = self._add_to_people(email, classification)
-            modified_files.extend(files)
-
         elif category == "knowledge":
             file = self._add_to_knowledge(email, classification)
             if file:
@@ -62,28 +89,60 @@ class ContentRouter:
             file = self._add_to_daily_log(email, classification)
             modified_files.append(file)
 
-        # Also add people interactions if people mentioned
-        if classification.people and category != "person_info":
-            self._add_people_interactions(email, classification)
+        # Person files get an entry for person_info and for any other category mentioning people
+        if classification.people:
+            files = self._write_person_entries(email, classification)
+            if category == "person_info":
+                modified_files.extend(files)
+
+        if self._autoflush:
+            self.flush_all()
 
         return modified_files
 
+    def flush_all(self) -> None:
+        """Write every section file changed since the last flush."""
+        for file_path in self._dirty:
+            file_path.write_text(self._file_cache[file_path])
+        self._dirty.clear()
+
+    def close(self) -> None:
+        """Write pending changes and drop the cached file contents."""
+        self.flush_all()
+        self._file_cache.clear()
+
+    @contextmanager
+    def bulk(self):
+        """Defer section file writes until the block exits, then flush once."""
+        previous = self._autoflush
+        self._autoflush = False
+        try:
+            yield self
+        finally:
+            self._autoflush = previous
+            self.flush_all()
+
     def _format_task_line(self, classification) -> str:
         """Format a task line for TODO sections."""
-        parts = [f"- [{classification.priority}]", classification.summary]
+        line = f"- [{classification.priority}] {classification.summary}"
 
         if classification.deadline:
-            parts.append(f"@deadline:{classification.deadline}")
+            line += f" @deadline:{classification.deadline}"
 
-        for person in classification.people[:2]:  # Limit to 2 people
-            parts.append(f"@person:{person}")
+        # Limit to 2 people
+        people = classification.people
+        if people:
+            line += f" @person:{people[0]}"
+            if len(people) > 1:
+                line += f" @person:{people[1]}"
 
-        if "waiting" in classification.tags:
-            parts.append("@waiting")
-        if "followup" in classification.tags:
-            parts.append("@followup")
+        tags = classification.tags
+        if "waiting" in tags:
+            line += " @waiting"
+        if "followup" in tags:
+            line += " @followup"
 
-        return " ".join(parts)
+        return line
 
     def _insert_into_section(
         self,
@@ -94,33 +153,28 @@ class ContentRouter:
     ) -> None:
         """Insert content under a section header in a markdown file."""
         file_path = Path(file_path)
+        self._dirty.add(file_path)
 
-        if not file_path.exists():
-            # Create file with section
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(f"# {file_path.stem.title()}\n\n{section_header}\n{content}\n")
-            return
-
-        text = file_path.read_text()
-        lines = text.split('\n')
+        text = self._file_cache.get(file_path)
+        if text is None:
+            if not file_path.exists():
+                # Create file with section
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                self._file_cache[file_path] = f"# {file_path.stem.title()}\n\n{section_header}\n{content}\n"
+                return
+            text = file_path.read_text()
 
         # Find section
-        section_idx = None
-        for i, line in enumerate(lines):
-            if line.strip() == section_header:
-                section_idx = i
-                break
+        section_end = _find_line(text, section_header)
 
-        if section_idx is not None:
+        if section_end >= 0:
             # Insert after section header
-            lines.insert(section_idx + 1, content)
+            text = f"{text[:section_end]}\n{content}{text[section_end:]}"
         elif create_section:
             # Add section at end
-            lines.append("")
-            lines.append(section_header)
-            lines.append(content)
+            text = f"{text}\n\n{section_header}\n{content}"
 
-        file_path.write_text('\n'.join(lines))
+        self._file_cache[file_path] = text
 
     def _add_to_work(self, email, classification) -> None:
         """Add task to work.md TODO section."""
@@ -137,42 +191,31 @@ class ContentRouter:
         task_line = self._format_task_line(classification)
         self._insert_into_section(self.home_file, "## TODO", task_line)
 
-    def _add_to_people(self, email, classification) -> list[str]:
-        """Add person info to people files."""
-        modified = []
-
-        for person in classification.people:
-            # Create safe filename
-            safe_name = re.sub(r'[^\w\s-]', '', person.lower())
-            safe_name = re.sub(r'[-\s]+', '-', safe_name).strip('-')
-            person_file = self.people_dir / f"{safe_name}.md"
-
-            date_str = email.date.strftime("%Y-%m-%d")
-            interaction = f"- {date_str}: {classification.summary} (via email)"
-
-            self._insert_into_section(person_file, "## Interactions", interaction)
-            modified.append(str(person_file))
-
-        return modified
-
-    def _add_people_interactions(self, email, classification) -> None:
-        """Add interaction entries for mentioned people."""
+    def _write_person_entries(self, email, classification) -> list[str]:
+        """Add an interaction entry to the file of each mentioned person."""
         date_str = email.date.strftime("%Y-%m-%d")
+        if classification.category == "person_info":
+            interaction = f"- {date_str}: {classification.summary} (via email)"
+        else:
+            interaction = f"- {date_str}: Email regarding: {classification.summary}"
 
+        # Names that slugify to the same file are written with one insertion
+        by_file: dict[Path, list[str]] = {}
         for person in classification.people:
-            safe_name = re.sub(r'[^\w\s-]', '', person.lower())
-            safe_name = re.sub(r'[-\s]+', '-', safe_name).strip('-')
-            person_file = self.people_dir / f"{safe_name}.md"
+            person_file = self.people_dir / f"{_slugify(person)}.md"
+            by_file.setdefault(person_file, []).append(interaction)
 
-            interaction = f"- {date_str}: Email regarding: {classification.summary}"
-            self._insert_into_section(person_file, "## Interactions", interaction)
+        for person_file, entries in by_file.items():
+            # Newest first, as if each entry had been inserted on its own
+            self._insert_into_section(person_file, "## Interactions", "\n".join(reversed(entries)))
+
+        return [str(person_file) for person_file in by_file]
 
     def _add_to_knowledge(self, email, classification) -> Optional[str]:
         """Add knowledge entry."""
         # Extract topic from summary
         summary = classification.summary
-        safe_topic = re.sub(r'[^\w\s-]', '', summary[:50].lower())
-        safe_topic = re.sub(r'[-\s]+', '-', safe_topic).strip('-')
+        safe_topic = _slugify(summary[:50])
 
         if not safe_topic:
             safe_topic = "misc"
@@ -191,8 +234,9 @@ class ContentRouter:
 """
 
         if knowledge_file.exists():
-            existing = knowledge_file.read_text()
-            knowledge_file.write_text(existing + content)
+            # Entries go at the end, so there is no need to read the file back
+            with open(knowledge_file, 'a') as f:
+                f.write(content)
         else:
             knowledge_file.write_text(f"# {summary}\n{content}")
 
@@ -209,6 +253,8 @@ class ContentRouter:
         if classification.action_items:
             entry += "\n" + "\n".join(f"  - [ ] {item}" for item in classification.action_items)
 
+        # Entries stay newest first under the header, so the log is edited
+        # through the section cache rather than appended to
         self._insert_into_section(log_file, "## Email Activity", entry)
 
         return str(log_file)
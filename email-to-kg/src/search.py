@@ -16,7 +16,7 @@ def _normalize_datetime(dt: datetime) -> datetime:
         return dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(timezone.utc)
 from typing import List, Optional, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, fields
 
 
 @dataclass
@@ -42,6 +42,22 @@ class SearchResult:
     relevance_score: float
 
 
+# SearchResult is flat, so rows are built from its field names instead of asdict()
+_RESULT_FIELDS = tuple(f.name for f in fields(SearchResult))
+
+
+# Query words that never become search keywords
+_STOPWORDS = frozenset({
+    'find', 'search', 'show', 'get', 'any', 'all', 'me', 'my',
+    'emails', 'email', 'messages', 'message', 'mail',
+    'about', 'regarding', 'concerning', 'mentioning', 'containing',
+    'with', 'the', 'a', 'an', 'and', 'or', 'for', 'in', 'on',
+    'from', 'to', 'last', 'this', 'past', 'week', 'month', 'day', 'days',
+    'yesterday', 'today', 'what', 'did', 'say', 'said', 'says',
+    'anything', 'something', 'everything', 'recent', 'new', 'old'
+})
+
+
 def parse_natural_query(query: str) -> SearchQuery:
     """
     Parse natural language query into structured search parameters.
@@ -86,18 +102,8 @@ def parse_natural_query(query: str) -> SearchQuery:
         date_from = datetime.now(timezone.utc) - timedelta(days=int(days_match.group(1)))
 
     # Extract keywords (remove stopwords and query syntax)
-    stopwords = {
-        'find', 'search', 'show', 'get', 'any', 'all', 'me', 'my',
-        'emails', 'email', 'messages', 'message', 'mail',
-        'about', 'regarding', 'concerning', 'mentioning', 'containing',
-        'with', 'the', 'a', 'an', 'and', 'or', 'for', 'in', 'on',
-        'from', 'to', 'last', 'this', 'past', 'week', 'month', 'day', 'days',
-        'yesterday', 'today', 'what', 'did', 'say', 'said', 'says',
-        'anything', 'something', 'everything', 'recent', 'new', 'old'
-    }
-
     words = re.findall(r'\b\w+\b', query_lower)
-    keywords = [w for w in words if w not in stopwords and len(w) > 2]
+    keywords = [w for w in words if w not in _STOPWORDS and len(w) > 2]
 
     # Remove the sender name from keywords if present
     if sender:
@@ -120,47 +126,53 @@ def search_emails(emails: List[Any], query: SearchQuery) -> List[SearchResult]:
     """
     results = []
 
+    # Query terms are lowercased once per search rather than once per email
+    sender = query.sender.lower() if query.sender else None
+    keywords = [(keyword, keyword.lower()) for keyword in query.keywords]
+    date_from = _normalize_datetime(query.date_from)
+    date_to = _normalize_datetime(query.date_to)
+
     for email in emails:
         # Filter by sender if specified
-        if query.sender:
-            sender_lower = email.from_addr.lower()
-            if query.sender.lower() not in sender_lower:
-                continue
+        if sender and sender not in email.from_addr.lower():
+            continue
 
         # Filter by date range (normalize to handle mixed naive/aware datetimes)
-        email_date = _normalize_datetime(email.date)
-        if query.date_from and email_date < _normalize_datetime(query.date_from):
-            continue
-        if query.date_to and email_date > _normalize_datetime(query.date_to):
-            continue
+        if date_from or date_to:
+            email_date = _normalize_datetime(email.date)
+            if date_from and email_date < date_from:
+                continue
+            if date_to and email_date > date_to:
+                continue
 
         # Score relevance based on keyword matches
         score = 0.0
         match_contexts = []
 
-        for keyword in query.keywords:
-            keyword_lower = keyword.lower()
+        # Lowercase once per email rather than once per keyword
+        if keywords:
+            subject_lower = email.subject.lower()
+            body_lower = email.body.lower()
 
+        for keyword, keyword_lower in keywords:
             # Check subject (higher weight)
-            if keyword_lower in email.subject.lower():
+            if keyword_lower in subject_lower:
                 score += 2.0
                 match_contexts.append(f"Subject: '{keyword}'")
 
-            # Check body
-            if keyword_lower in email.body.lower():
+            # Check body; snippets are only built for emails that match
+            idx = body_lower.find(keyword_lower)
+            if idx >= 0:
                 score += 1.0
                 # Extract context snippet around the match
-                idx = email.body.lower().find(keyword_lower)
-                if idx >= 0:
-                    start = max(0, idx - 40)
-                    end = min(len(email.body), idx + len(keyword) + 40)
-                    snippet = email.body[start:end].strip()
-                    snippet = re.sub(r'\s+', ' ', snippet)  # Normalize whitespace
-                    if start > 0:
-                        snippet = "..." + snippet
-                    if end < len(email.body):
-                        snippet = snippet + "..."
-                    match_contexts.append(snippet)
+                start = max(0, idx - 40)
+                end = min(len(email.body), idx + len(keyword) + 40)
+                snippet = ' '.join(email.body[start:end].split())  # Normalize whitespace
+                if start > 0:
+                    snippet = "..." + snippet
+                if end < len(email.body):
+                    snippet = snippet + "..."
+                match_contexts.append(snippet)
 
         # If no keywords specified, include all (filtered by sender/date)
         if not query.keywords:
@@ -172,7 +184,7 @@ def search_emails(emails: List[Any], query: SearchQuery) -> List[SearchResult]:
             body_preview = email.body[:500]
             if len(email.body) > 500:
                 body_preview += "..."
-            body_preview = re.sub(r'\s+', ' ', body_preview).strip()
+            body_preview = ' '.join(body_preview.split())
 
             results.append(SearchResult(
                 message_id=email.message_id,
@@ -201,6 +213,6 @@ def format_results_json(results: List[SearchResult], query: SearchQuery) -> str:
             "date_to": query.date_to.isoformat() if query.date_to else None,
         },
         "result_count": len(results),
-        "emails": [asdict(r) for r in results]
+        "emails": [{name: getattr(r, name) for name in _RESULT_FIELDS} for r in results]
     }
-    return json.dumps(output, indent=2)
+    return json.dumps(output, separators=(',', ':'))
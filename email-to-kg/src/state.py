@@ -4,9 +4,19 @@ State management for email sync deduplication.
 
 import json
 import hashlib
+import os
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Set, Optional
+from typing import BinaryIO, List, Set, Optional, Tuple
+
+# Seen emails are stored as truncated SHA256 digests of their fingerprint
+DIGEST_SIZE = 16
+
+
+def _digest(fingerprint: str) -> bytes:
+    """Fixed-width key under which a fingerprint is kept in the seen set."""
+    return hashlib.sha256(fingerprint.encode()).digest()[:DIGEST_SIZE]
 
 
 class SyncState:
@@ -16,52 +26,128 @@ class SyncState:
         self.state_dir = Path(state_dir)
         self.state_dir.mkdir(parents=True, exist_ok=True)
 
-        self.seen_file = self.state_dir / "seen_emails.json"
+        # Append-only log of fixed-width fingerprint digests
+        self.seen_file = self.state_dir / "seen_emails.bin"
+        self.legacy_seen_file = self.state_dir / "seen_emails.json"
         self.last_sync_file = self.state_dir / "last_sync.json"
+        self.uid_file = self.state_dir / "uid_state.json"
+
+        self.seen_ids: Set[bytes] = set()
+
+        # Digests not yet appended; mark_seen flushes them unless inside bulk()
+        self._pending: List[bytes] = []
+        self._autoflush = True
+        self._log: Optional[BinaryIO] = None
 
-        self.seen_ids: Set[str] = set()
         self._load_state()
 
     def _load_state(self) -> None:
         """Load state from disk."""
-        if self.seen_file.exists():
-            try:
-                with open(self.seen_file, 'r') as f:
-                    data = json.load(f)
-                    self.seen_ids = set(data.get("message_ids", []))
-            except (json.JSONDecodeError, KeyError):
-                self.seen_ids = set()
+        if not self.seen_file.exists():
+            if self.legacy_seen_file.exists():
+                self._migrate_legacy_state()
+            return
+
+        data = self.seen_file.read_bytes()
+        complete = len(data) - len(data) % DIGEST_SIZE
+        self.seen_ids = {data[i:i + DIGEST_SIZE] for i in range(0, complete, DIGEST_SIZE)}
+
+        # A crash mid-append can leave a partial record, and a digest can be
+        # appended twice if two syncs overlap; rewrite so later appends stay
+        # aligned and the log holds each digest once
+        if complete != len(data) or complete // DIGEST_SIZE > len(self.seen_ids):
+            self._save_state()
+
+    def _migrate_legacy_state(self) -> None:
+        """Convert the JSON-list seen file of older versions to the digest log."""
+        try:
+            with open(self.legacy_seen_file, 'r') as f:
+                fingerprints = json.load(f).get("message_ids", [])
+        except (json.JSONDecodeError, AttributeError):
+            fingerprints = []
+
+        self.seen_ids = {_digest(fp) for fp in fingerprints if isinstance(fp, str)}
+        self._save_state()
+        self.legacy_seen_file.unlink()
 
     def _save_state(self) -> None:
-        """Save state to disk."""
-        with open(self.seen_file, 'w') as f:
-            json.dump({
-                "message_ids": list(self.seen_ids),
-                "updated_at": datetime.now().isoformat()
-            }, f, indent=2)
+        """Rewrite the seen log from the in-memory set, dropping duplicate records."""
+        if self._log:
+            self._log.close()
+            self._log = None
+
+        tmp_file = self.seen_file.with_suffix('.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(b"".join(self.seen_ids))
+        os.replace(tmp_file, self.seen_file)
+
+        self._pending.clear()
+
+    def flush(self) -> None:
+        """Append pending seen IDs to the log."""
+        if not self._pending:
+            return
+
+        if self._log is None:
+            self._log = open(self.seen_file, 'ab')
+        self._log.write(b"".join(self._pending))
+        self._log.flush()
+
+        self._pending.clear()
+
+    @contextmanager
+    def bulk(self):
+        """Defer mark_seen writes until the block exits, then flush once."""
+        previous = self._autoflush
+        self._autoflush = False
+        try:
+            yield self
+        finally:
+            self._autoflush = previous
+            self.flush()
 
     def get_email_fingerprint(self, email) -> str:
         """
         Generate fingerprint for an email.
-        Uses Message-ID if available, otherwise SHA256 of key fields.
+        Uses Message-ID if available, otherwise a 16-byte BLAKE2b of key fields.
         """
         if email.message_id:
             return email.message_id
 
         # Fallback fingerprint
         content = f"{email.from_addr}|{email.subject}|{email.date.isoformat()}"
-        return hashlib.sha256(content.encode()).hexdigest()
+        return hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+
+    def seen_key(self, email) -> bytes:
+        """Key under which an email is recorded in the seen set."""
+        return _digest(self.get_email_fingerprint(email))
 
     def is_seen(self, email) -> bool:
         """Check if email has already been processed."""
-        fingerprint = self.get_email_fingerprint(email)
-        return fingerprint in self.seen_ids
+        return self.seen_key(email) in self.seen_ids
 
     def mark_seen(self, email) -> None:
         """Mark email as processed."""
-        fingerprint = self.get_email_fingerprint(email)
-        self.seen_ids.add(fingerprint)
-        self._save_state()
+        key = self.seen_key(email)
+        if key in self.seen_ids:
+            return
+        self.seen_ids.add(key)
+        self._pending.append(key)
+        if self._autoflush:
+            self.flush()
+
+    def mark_seen_batch(self, emails) -> None:
+        """Mark several emails as processed with a single write."""
+        for email in emails:
+            key = self.seen_key(email)
+            if key not in self.seen_ids:
+                self.seen_ids.add(key)
+                self._pending.append(key)
+        self.flush()
+
+    def snapshot_seen(self) -> Set[bytes]:
+        """Return a copy of the processed seen keys for bulk lookups."""
+        return set(self.seen_ids)
 
     def get_last_sync(self) -> Optional[datetime]:
         """Get timestamp of last sync."""
@@ -79,7 +165,33 @@ class SyncState:
         with open(self.last_sync_file, 'w') as f:
             json.dump({
                 "last_sync": datetime.now().isoformat()
-            }, f, indent=2)
+            }, f, separators=(',', ':'))
+
+    def get_uid_state(self, folder: str = "INBOX") -> Tuple[Optional[int], Optional[int]]:
+        """Get (uidvalidity, last_uid) recorded for a folder."""
+        if self.uid_file.exists():
+            try:
+                with open(self.uid_file, 'r') as f:
+                    data = json.load(f)[folder]
+                    return data["uidvalidity"], data["last_uid"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                return None, None
+        return None, None
+
+    def update_uid_state(self, folder: str, uidvalidity: Optional[int], last_uid: int) -> None:
+        """Record the highest processed UID for a folder."""
+        data = {}
+        if self.uid_file.exists():
+            try:
+                with open(self.uid_file, 'r') as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                data = {}
+
+        data[folder] = {"uidvalidity": uidvalidity, "last_uid": last_uid}
+
+        with open(self.uid_file, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
 
     def get_stats(self) -> dict:
         """Get sync statistics."""
@@ -95,3 +207,5 @@ class SyncState:
         self._save_state()
         if self.last_sync_file.exists():
             self.last_sync_file.unlink()
+        if self.uid_file.exists():
+            self.uid_file.unlink()